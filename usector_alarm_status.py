@@ -97,7 +97,7 @@ class AlarmStatusProvider:
                 return False
             raise req_err
 
-        return (
-            response.status_code == 200
-            and response.json()["Status"] == FULLY_ARMED_STATUS_CODE
-        )
+        if response.status_code != 200:
+            response.close()  # Body never read, so release the socket here
+            return False
+        return response.json()["Status"] == FULLY_ARMED_STATUS_CODE
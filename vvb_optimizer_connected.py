@@ -32,17 +32,18 @@ check referral.link in repo
 # mip.install("datetime")
 
 
+import array
 import asyncio
 import sys
 import time
 import gc
-import io
 from datetime import date, timedelta
-from machine import Pin, PWM
+from machine import Pin, PWM, mem32
+from micropython import const
+import micropython
 import rp2
 import network
 import ntptime
-import requests
 
 
 # https://www.raspberrypi.com/documentation/pico-sdk/networking.html#CYW43_COUNTRY_
@@ -51,10 +52,16 @@ WLAN_SSID = "your ssid"
 WLAN_PASS = "your pass"
 NORDPOOL_REGION = "SE3"
 NTP_HOST = "se.pool.ntp.org"
+NTP_INTERVAL_H = 24  # RTC drift is a few seconds per day
 SEC_PER_MIN = 60
+MS_PER_MIN = const(60_000)  # asyncio.sleep_ms() is the native time base
+ONE_DAY = timedelta(days=1)
 EXTRA_HOT_DURATION_S = 60 * SEC_PER_MIN  # MIN_LEGIONELLA_TEMP duration after POR
 OVERRIDE_UTC_UNIX_TIMESTAMP = None  # -3600 to Simulate script behaviour from 1h ago
 MAX_NETWORK_ATTEMPTS = 10
+MIN_BACKOFF_S = 2  # Doubled per failed attempt, up to MAX_BACKOFF_S
+MAX_BACKOFF_S = 60
+HEALTHY_RUN_S = 60 * SEC_PER_MIN  # Optimization runs lasting longer restart backoff
 UTC_OFFSET_IN_S = 3600
 COP_FACTOR = 2.5  # Utilize leakage unless heatpump will be cheaper
 HIGH_WATER_TAKEOUT_LIKELYHOOD = (
@@ -62,84 +69,130 @@ HIGH_WATER_TAKEOUT_LIKELYHOOD = (
 )
 HEAT_LEAK_VALUE_THRESHOLD = 10
 EXTREME_COLD_THRESHOLD = -8  # Heat leak always valuable
-MAX_HOURS_NEEDED_TO_HEAT = (
+MAX_HOURS_NEEDED_TO_HEAT = const(
     4  # Should exceed (MIN_DAILY_TEMP - MIN_TEMP) / DEGREES_PER_H
 )
-NORMAL_HOURS_NEEDED_TO_HEAT = MAX_HOURS_NEEDED_TO_HEAT - 1
-NUM_MOST_EXPENSIVE_HOURS = 3  # Avoid heating
+NORMAL_HOURS_NEEDED_TO_HEAT = const(MAX_HOURS_NEEDED_TO_HEAT - 1)
+NUM_MOST_EXPENSIVE_HOURS = const(3)  # Avoid heating
 AMBIENT_TEMP = 20
 DEGREES_PER_H = 9.4  # Nibe 300-CU ER56-CU 275L with 3kW
-HEATER_KW = 3
+HEATER_KW = const(3)
 HEAT_LOSS_PER_DAY_KWH = 2.8  # Leakage when not at home
 DEGREES_LOST_PER_H = round(
     ((HEAT_LOSS_PER_DAY_KWH / HEATER_KW) * DEGREES_PER_H) / 24, 2
 )
-LAST_MORNING_HEATING_H = 6
-FIRST_EVENING_HIGH_TAKEOUT_H = 20  # : 00 - by which time re-heating should have ran
-DAILY_COMFORT_LAST_H = 21  # :59
-NEW_PRICE_EXPECTED_HOUR = 12
-NEW_PRICE_EXPECTED_MIN = 45
-MAX_TEMP = 78
-MIN_TEMP = 25
+LAST_MORNING_HEATING_H = const(6)
+FIRST_EVENING_HIGH_TAKEOUT_H = const(20)  # :00 by which time re-heating should have ran
+DAILY_COMFORT_LAST_H = const(21)  # :59
+NEW_PRICE_EXPECTED_HOUR = const(12)
+NEW_PRICE_EXPECTED_MIN = const(45)
+MAX_TEMP = const(78)
+MIN_TEMP = const(25)
 MIN_NUDGABLE_TEMP = 28.6  # Setting it any lower will just make it MIN stuck
 MIN_USABLE_TEMP = 35  # Good for hand washing, and one hour away from shower temp
 MIN_DAILY_TEMP = 50
+EXTRA_KWH_LOSS_PER_PRE_HEAT_H = (
+    (DEGREES_PER_H + MIN_DAILY_TEMP - AMBIENT_TEMP) / (MIN_DAILY_TEMP - AMBIENT_TEMP)
+    - 1
+) * (HEAT_LOSS_PER_DAY_KWH / 24)
 MIN_LEGIONELLA_TEMP = 65
 LEGIONELLA_INTERVAL = 10  # In days
 WEEKDAYS_WITH_EXTRA_TAKEOUT = [0, 2, 4, 6]  # 6 == Sunday
 WEEKDAYS_WITH_EXTRA_MORNING_TAKEOUT = [0, 3]  # 0 == Monday
+EXTRA_TAKEOUT_MASK = sum(1 << weekday for weekday in WEEKDAYS_WITH_EXTRA_TAKEOUT)
+EXTRA_MORNING_TAKEOUT_MASK = sum(
+    1 << weekday for weekday in WEEKDAYS_WITH_EXTRA_MORNING_TAKEOUT
+)
 KWN_PER_MWH = 1000
 OVERHEAD_BASE_PRICE = 0.067032287290990  # In EUR for tax, purchase and transfer costs (wo VAT)
 HIGH_PRICE_THRESHOLD = 0.15  # In EUR (incl OVERHEAD_BASE_PRICE)
 ACCEPTABLE_PRICING_ERROR = 0.003  # In EUR - how far from cheapest considder same
 LOW_PRICE_VARIATION_PERCENT = 1.1  # Limit storage temp if just 10% cheaper
 PRICE_API_URL = "https://dataportal-api.nordpoolgroup.com/api/DayAheadPrices?currency=EUR&deliveryArea="
+# JSON keys located in the price response instead of parsing it all
+PRICE_ENTRY_KEY = b'"entryPerArea"'
+PRICE_AREA_KEY = b'"' + NORDPOOL_REGION.encode() + b'"'
+PRICE_STATE_KEY = b'"areaStates"'
+PRICE_STATE_FIELD = b'"state"'
 # TEMPERATURE_URL should return a number "x.y" for degrees C
 TEMPERATURE_URL = (
     "https://www.temperatur.nu/termo/gettemp.php?stadname=partille&what=temp"
 )
-
-PWM_25_DEGREES = 1172  # Min rotation (@MIN_TEMP)
-PWM_78_DEGREES = 8300  # Max rotation (@MAX_TEMP)
-PWM_PER_DEGREE = (PWM_78_DEGREES - PWM_25_DEGREES) / 53
+OUTDOOR_TEMP_MAX_AGE_S = 3 * 3600  # Outdoor temperature changes slowly
+HTTP_TIMEOUT_S = 10
+PRICE_CACHE_FILE = "/prices{}.bin"  # Final prices per day parity, survive a reset
+REQUEST_HEAD_MAX_BYTES = const(1024)  # Request line and headers, rest is dropped
+REQUEST_TIMEOUT_S = 2
+HTTP_200_HTML = b"HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n"
+HTTP_404 = b"HTTP/1.0 404 Not Found\r\n\r\n"
+
+PWM_25_DEGREES = const(1172)  # Min rotation (@MIN_TEMP)
+PWM_78_DEGREES = const(8300)  # Max rotation (@MAX_TEMP)
+PWM_PER_DECI_DEGREE_Q8 = const(  # Fixed point (8 fractional bits) per 0.1 degree
+    ((PWM_78_DEGREES - PWM_25_DEGREES) << 8) // ((MAX_TEMP - MIN_TEMP) * 10)
+)
+PWM_LUT_MAX_INDEX = const((MAX_TEMP - MIN_TEMP) * 10)
+PWM_LUT = array.array(  # PWM per 0.1 degree from MIN_TEMP to MAX_TEMP
+    "H",
+    (
+        PWM_25_DEGREES + ((deci_degrees * PWM_PER_DECI_DEGREE_Q8) >> 8)
+        for deci_degrees in range(PWM_LUT_MAX_INDEX + 1)
+    ),
+)
+PWM_SLICE0_CC = const(0x4005000C)  # RP2040 PWM CH0_CC, GP0 is channel A
+PWM_SLICE0_TOP = const(0x40050010)  # RP2040 PWM CH0_TOP
 ROTATION_SECONDS = 2
+MAX_LOG_BYTES = const(8 * 1024)  # Oldest quarter is dropped when exceeded
+LOG_ROW_END = b"<br>\n"
 
 
-def log_print(*args, **kwargs):
-    global last_log
+@micropython.viper
+def log_row_start(log_buf, from_index: int) -> int:
+    """Index of the first log row starting at or after from_index"""
+    log_bytes = ptr8(log_buf)
+    log_len = int(len(log_buf))
+    while from_index < log_len:
+        if log_bytes[from_index] == 0x0A:  # Last byte of LOG_ROW_END
+            return from_index + 1
+        from_index += 1
+    return log_len
 
-    log_str = io.StringIO()
-    print("".join(map(str, args)), file=log_str, **kwargs)
-    last_log.append(log_str.getvalue())
-    if len(last_log) > 125:
-        last_log.pop(0)
-        last_log.pop(0)
-        last_log.pop(0)
-        last_log.pop(0)
-        last_log.pop(0)
-        gc.collect()
-    print(f"   {log_str.getvalue().rstrip()}")
+
+def log_print(*args):
+    log_str = "".join(map(str, args))
+    last_log.extend(log_str.encode())
+    last_log.extend(LOG_ROW_END)
+    if len(last_log) > MAX_LOG_BYTES:
+        last_log[: log_row_start(last_log, MAX_LOG_BYTES // 4)] = b""
+    print(f"   {log_str}")
 
 
 class SimpleTemperatureProvider:
     def __init__(self):
         self.outdoor_temperature = 0
-        self.last_update = None
+        self.last_update_ticks = None
 
-    def get_outdoor_temp(self):
-        if self.last_update is not None and (self.last_update + 600) > time.time():
-            return self.outdoor_temperature
+    async def get_outdoor_temp(self):
+        if self.last_update_ticks is not None:
+            age_ms = time.ticks_diff(time.ticks_ms(), self.last_update_ticks)
+            if 0 <= age_ms < OUTDOOR_TEMP_MAX_AGE_S * 1000:  # Negative if wrapped
+                return self.outdoor_temperature
         try:
-            outdoor_temperature_req = requests.get(TEMPERATURE_URL, timeout=10.0)
-            if outdoor_temperature_req.status_code == 200:
+            status_code, outdoor_temperature_body = await asyncio.wait_for(
+                http_get(TEMPERATURE_URL), HTTP_TIMEOUT_S
+            )
+            if status_code == 200:
+                outdoor_temperature_text = str(outdoor_temperature_body, "utf-8")
                 try:
-                    self.outdoor_temperature = float(outdoor_temperature_req.text)
-                    self.last_update = time.time()
-                    gc.collect()
+                    self.outdoor_temperature = float(outdoor_temperature_text)
+                    self.last_update_ticks = time.ticks_ms()
                 except ValueError:
                     log_print(
-                        f"Ignored {outdoor_temperature_req.text} from {TEMPERATURE_URL}"
+                        f"Ignored {outdoor_temperature_text} from {TEMPERATURE_URL}"
                     )
+            gc.collect()
+        except asyncio.TimeoutError:
+            log_print("Ignoring temperature read timeout")
         except OSError as req_err:
             if req_err.args[0] == 110:  # ETIMEDOUT
                 log_print("Ignoring temperature read timeout")
@@ -151,7 +204,8 @@ class SimpleTemperatureProvider:
 class TimeProvider:
     def __init__(self):
         ntptime.host = NTP_HOST
-        self.last_sync_time = time.time()
+        self.last_sync_ticks = time.ticks_ms()  # Unaffected by NTP adjustments
+        self.sync_retry_s = 0  # Backoff after failed syncs, 0 when last sync worked
         self.current_utc_time = (
             time.time() + OVERRIDE_UTC_UNIX_TIMESTAMP
             if (OVERRIDE_UTC_UNIX_TIMESTAMP is not None)
@@ -162,73 +216,108 @@ class TimeProvider:
     def hourly_timekeeping(self):
         if OVERRIDE_UTC_UNIX_TIMESTAMP is not None:
             self.current_utc_time += 3600
-        else:
-            if (time.time() - self.last_sync_time) > (12 * 3600):
-                self.sync_utc_time()  # Attempt sync time twice per day
-                self.last_sync_time = time.time()
+        elif time.ticks_diff(time.ticks_ms(), self.last_sync_ticks) > 1000 * (
+            self.sync_retry_s or NTP_INTERVAL_H * 3600
+        ):
+            if self.sync_utc_time(max_attempts=1):
+                self.sync_retry_s = 0
+            else:  # Retry next wake-up, then back off 1h, 2h, 4h...
+                self.sync_retry_s = min(
+                    2 * self.sync_retry_s or 1800, NTP_INTERVAL_H * 3600
+                )
+            self.last_sync_ticks = time.ticks_ms()
 
     def get_utc_unix_timestamp(self):
         return time.time() if self.current_utc_time is None else self.current_utc_time
 
     @staticmethod
-    def sync_utc_time():
-        max_wait = MAX_NETWORK_ATTEMPTS
-        while max_wait > 0:
+    def sync_utc_time(max_attempts=MAX_NETWORK_ATTEMPTS):
+        synced = False
+        while max_attempts > 0:
             try:
                 log_print(f"Local time before NTP sync：{time.localtime()}")
                 ntptime.settime()
                 log_print(f"UTC   time after  NTP sync：{time.localtime()}")
+                synced = True
                 break
             except Exception as excep:
                 log_print(f"Time sync error: {excep}")
-                time.sleep(1)
-                max_wait -= 1
+                max_attempts -= 1
+                if max_attempts > 0:
+                    time.sleep(1)
+        gc.collect()  # Release NTP socket while nothing time critical runs
+        return synced
+
+
+@micropython.asm_thumb
+def write_pwm_cc_a(r0, r1):  # r0 = CC register address, r1 = channel A level
+    ldr(r2, [r0, 0])
+    lsr(r2, r2, 16)
+    lsl(r2, r2, 16)  # Keep channel B level
+    orr(r2, r1)
+    str(r2, [r0, 0])  # Full word store, narrow writes get replicated
 
 
 class Thermostat:
     def __init__(self):
         self.pwm = PWM(Pin(0))
         self.pwm.freq(50)
+        self.pwm.duty_u16(0)  # Configures the slice, later levels are poked directly
+        self.pwm_steps = (mem32[PWM_SLICE0_TOP] & 0xFFFF) + 1
         self.prev_degrees = None
+        self.prev_pwm_degrees = None
+        self.servo_lock = asyncio.Lock()  # Web overrides may race the optimizer
+
+    def write_duty(self, duty_u16):
+        # Same rounding as PWM.duty_u16() when scaling to the counter period
+        write_pwm_cc_a(PWM_SLICE0_CC, (duty_u16 * self.pwm_steps + 32767) // 65535)
 
     @staticmethod
-    def get_pwm_degrees(degrees):
-        pwm_degrees = PWM_25_DEGREES
-        if degrees > MIN_TEMP:
-            pwm_degrees += (degrees - MIN_TEMP) * PWM_PER_DEGREE
-        return min(pwm_degrees, PWM_78_DEGREES)
-
-    def set_thermosat(self, degrees):
-        if self.prev_degrees != degrees:
-            pwm_degrees = self.get_pwm_degrees(degrees)
-            self.pwm.duty_u16(int(pwm_degrees))
-            time.sleep(ROTATION_SECONDS)
-            self.pwm.duty_u16(0)
-            self.prev_degrees = degrees
-
-    def nudge(self, nudge_degrees):
+    @micropython.viper
+    def get_pwm_degrees(deci_degrees: int) -> int:
+        lut_index = deci_degrees - MIN_TEMP * 10
+        if lut_index < 0:
+            lut_index = 0
+        elif lut_index > PWM_LUT_MAX_INDEX:
+            lut_index = PWM_LUT_MAX_INDEX
+        pwm_lut = ptr16(PWM_LUT)
+        return pwm_lut[lut_index]
+
+    async def set_thermosat(self, degrees):
+        pwm_degrees = self.get_pwm_degrees(round(degrees * 10))
+        if self.prev_pwm_degrees != pwm_degrees:  # Else servo already there
+            async with self.servo_lock:
+                self.write_duty(pwm_degrees)
+                await asyncio.sleep(ROTATION_SECONDS)
+                self.write_duty(0)
+            self.prev_pwm_degrees = pwm_degrees
+        self.prev_degrees = degrees
+
+    async def nudge(self, nudge_degrees):
         if self.prev_degrees is not None:
-            pwm_degrees = self.get_pwm_degrees(self.prev_degrees + nudge_degrees)
-            self.pwm.duty_u16(int(pwm_degrees))
+            async with self.servo_lock:
+                pwm_degrees = self.get_pwm_degrees(
+                    round((self.prev_degrees + nudge_degrees) * 10)
+                )
+                self.write_duty(pwm_degrees)
 
-            time.sleep(1)
+                await asyncio.sleep(1)
 
-            pwm_degrees = self.get_pwm_degrees(self.prev_degrees)
-            self.pwm.duty_u16(int(pwm_degrees))
-            time.sleep(
-                (2 * ROTATION_SECONDS)
-                if (self.prev_degrees == MIN_NUDGABLE_TEMP)
-                else 1
-            )
-            self.pwm.duty_u16(0)
+                self.write_duty(self.prev_pwm_degrees)
+                await asyncio.sleep(
+                    (2 * ROTATION_SECONDS)
+                    if (self.prev_degrees == MIN_NUDGABLE_TEMP)
+                    else 1
+                )
+                self.write_duty(0)
 
-    def nudge_down(self):
+    async def nudge_down(self):
         # log_print("Nudging down")
-        self.nudge(-5)
+        await self.nudge(-5)
 
-    def nudge_up(self):
+    async def nudge_up(self):
         # log_print("Nudging up")
-        self.nudge(5)
+        await self.nudge(5)
 
 
 def setup_wifi():
@@ -254,6 +343,91 @@ def setup_wifi():
     log_print(f"Connected with rssi {wlan.status('rssi')} and IP {wlan.ifconfig()[0]}")
 
 
+async def http_get(url):
+    """
+    Minimal HTTP/1.0 GET that lets other tasks run while waiting for the network.
+    Returns (status_code, body), where body is empty unless status_code is 200.
+    The body is returned undecoded, so a large response is only held once
+    """
+    protocol, _, host, path = url.split("/", 3)
+    port = 443 if protocol == "https:" else 80
+    reader, writer = await asyncio.open_connection(host, port, ssl=port == 443)
+    body = b""
+    try:
+        writer.write(f"GET /{path} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+        await writer.drain()
+        status_code = int((await reader.readline()).split()[1])
+        content_length = None
+        while True:
+            header = await reader.readline()
+            if not header.strip():
+                break
+            if header.lower().startswith(b"content-length:"):
+                content_length = int(header[15:])
+        if status_code == 200 and content_length is None:
+            body = await reader.read(-1)  # Server closes after HTTP/1.0 body
+        elif status_code == 200:
+            # Fill one buffer rather than growing bytes per received segment
+            body = bytearray(content_length)
+            body_view = memoryview(body)
+            received = 0
+            while received < content_length:
+                num_read = await reader.readinto(body_view[received:])
+                if not num_read:  # Cut off, never hand out a partial body
+                    raise OSError(f"Body ended at {received} of {content_length}")
+                received += num_read
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return (status_code, body)
+
+
+@micropython.viper
+def find_bytes(buf, marker, start: int) -> int:
+    """Index of marker in buf at or after start or -1, bytearray has no find()"""
+    buf_bytes = ptr8(buf)
+    marker_bytes = ptr8(marker)
+    marker_len = int(len(marker))
+    last_start = int(len(buf)) - marker_len
+    while start <= last_start:
+        match_len = 0
+        while match_len < marker_len:
+            if buf_bytes[start + match_len] != marker_bytes[match_len]:
+                break
+            match_len += 1
+        if match_len == marker_len:
+            return start
+        start += 1
+    return -1
+
+
+@micropython.viper
+def skip_json_syntax(buf, index: int) -> int:
+    """Index of the first byte at or after index that is not whitespace or :{["""
+    buf_bytes = ptr8(buf)
+    buf_len = int(len(buf))
+    while index < buf_len:
+        byte = buf_bytes[index]
+        if byte != 0x20 and byte != 0x0A and byte != 0x0D and byte != 0x09:
+            if byte != 0x3A and byte != 0x7B and byte != 0x5B:  # : { [
+                return index
+        index += 1
+    return buf_len
+
+
+@micropython.viper
+def json_value_end(buf, index: int) -> int:
+    """Index of the , } or ] that ends the scalar value starting at index"""
+    buf_bytes = ptr8(buf)
+    buf_len = int(len(buf))
+    while index < buf_len:
+        byte = buf_bytes[index]
+        if byte == 0x2C or byte == 0x7D or byte == 0x5D:  # , } ]
+            return index
+        index += 1
+    return buf_len
+
+
 async def get_cost(end_date):
     if not isinstance(end_date, date):
         raise RuntimeError("Error not a date")
@@ -261,43 +435,102 @@ async def get_cost(end_date):
         f"{NORDPOOL_REGION}&date={end_date.year}-{end_date.month}-{end_date.day}"
     )
     gc.collect()
-    result = requests.get(price_api_url, timeout=10.0)
-    if result.status_code != 200:
+    status_code, price_json = await asyncio.wait_for(
+        http_get(price_api_url), HTTP_TIMEOUT_S
+    )
+    if status_code != 200:
         return (None, None)
 
-    the_json_result = result.json()
+    num_rows = 0
+    entry_start = find_bytes(price_json, PRICE_ENTRY_KEY, 0)
+    while entry_start >= 0:
+        num_rows += 1
+        entry_start = find_bytes(price_json, PRICE_ENTRY_KEY, entry_start + 1)
+    if not 23 <= num_rows <= 25:  # DST days have 23 or 25 hours
+        return (None, None)
+    num_hours = 24 if num_rows == 23 else num_rows
+    cost_array = array.array("f", bytearray(4 * num_hours))  # Zeroed float32 storage
+    value_end = 0
+    for hour in range(num_rows):
+        entry_start = find_bytes(price_json, PRICE_ENTRY_KEY, value_end)
+        value_start = skip_json_syntax(price_json, entry_start + len(PRICE_ENTRY_KEY))
+        area_end = value_start + len(PRICE_AREA_KEY)
+        if price_json[value_start:area_end] != PRICE_AREA_KEY:
+            return (None, None)  # Not the layout requested with deliveryArea
+        value_start = skip_json_syntax(price_json, area_end)
+        value_end = json_value_end(price_json, value_start)
+        try:
+            price = float(price_json[value_start:value_end])
+        except ValueError:  # Such as null for a missing price
+            return (None, None)
+        cost_array[hour] = price / KWN_PER_MWH + OVERHEAD_BASE_PRICE
+    if num_rows == 23:
+        cost_array[23] = cost_array[0]  # DST hack - off by one in adjust days
+    is_final = False
+    state_start = find_bytes(price_json, PRICE_STATE_KEY, 0)
+    if state_start >= 0:
+        state_start = find_bytes(price_json, PRICE_STATE_FIELD, state_start)
+    if state_start >= 0:  # Else treated as preliminary
+        state_start = skip_json_syntax(price_json, state_start + len(PRICE_STATE_FIELD))
+        is_final = price_json[state_start : state_start + 7] == b'"Final"'
+    del price_json
     gc.collect()
+    return (is_final, cost_array)
 
-    cost_array = []
-    for row in the_json_result["multiAreaEntries"]:
-        cost_array.append(
-            row["entryPerArea"][NORDPOOL_REGION] / KWN_PER_MWH + OVERHEAD_BASE_PRICE
-        )
-    if len(cost_array) == 23:
-        cost_array.append(cost_array[0])  # DST hack - off by one in adjust days
-    return (the_json_result["areaStates"][0]["state"] == "Final", cost_array)
+
+def save_cost(cost_date, cost_array):
+    cache_file = PRICE_CACHE_FILE.format(cost_date.toordinal() % 2)
+    try:
+        with open(cache_file, "wb") as price_file:
+            price_file.write(f"{cost_date.toordinal()} {len(cost_array)}\n".encode())
+            price_file.write(cost_array)
+    except OSError as save_err:
+        log_print(f"Failed to cache prices: {save_err}")
 
 
+def load_cost(cost_date):
+    cache_file = PRICE_CACHE_FILE.format(cost_date.toordinal() % 2)
+    try:
+        with open(cache_file, "rb") as price_file:
+            ordinal, num_hours = map(int, price_file.readline().split())
+            if ordinal != cost_date.toordinal():
+                return None
+            cost_array = array.array("f", bytearray(4 * num_hours))
+            if price_file.readinto(cost_array) != 4 * num_hours:
+                return None
+    except (OSError, ValueError):
+        return None
+    log_print(f"Using cached prices for {cost_date.day} / {cost_date.month}")
+    return cost_array
+
+
+@micropython.native
 def heat_leakage_loading_desired(local_hour, today_cost, tomorrow_cost, outdoor_temp):
+    acceptable_pricing_error = ACCEPTABLE_PRICING_ERROR
     now_price = today_cost[local_hour]
     max_price = now_price
     min_price = now_price
-    while local_hour < 23:
-        local_hour += 1
-        max_price = max(max_price, today_cost[local_hour])
-        min_price = min(min_price, today_cost[local_hour])
-    if tomorrow_cost is not None:
-        for tomorrow_hour_price in tomorrow_cost:
-            max_price = max(max_price, tomorrow_hour_price)
+    for scan_hour in range(local_hour + 1, 24):
+        price = today_cost[scan_hour]
+        if price + acceptable_pricing_error < now_price:
+            return False  # Cheaper later today, so now is never the time
+        if price > max_price:
+            max_price = price
+        elif price < min_price:
+            min_price = price
+    if tomorrow_cost is not None and max_price <= (min_price * COP_FACTOR):
+        max_price = max(max_price, max(tomorrow_cost))
     if (outdoor_temp <= EXTREME_COLD_THRESHOLD) or max_price > (min_price * COP_FACTOR):
         log_print(f"Extra heating due to COP? now: {now_price}. min: {min_price}")
-        return now_price <= (min_price + ACCEPTABLE_PRICING_ERROR)
+        return now_price <= (min_price + acceptable_pricing_error)
     return False
 
 
-def now_is_cheap_in_forecast(now_hour, today_cost, tomorrow_cost):
+@micropython.native
+def summarize_forecast(now_hour, today_cost, tomorrow_cost, cheaper_later_hour):
     """
-    Scan 16h ahead and check if now is the best time to buffer some comfort
+    Scan 16h ahead and check if now is the best time to buffer some comfort,
+    and if now is significantly cheaper than max price ahead
     """
     scan_hours_remaining = 16
     hours_til_cheaper = 0
@@ -306,43 +539,48 @@ def now_is_cheap_in_forecast(now_hour, today_cost, tomorrow_cost):
     min_price_ahead = max_price_ahead
     for scan_hour in range(now_hour, min(24, now_hour + scan_hours_remaining)):
         scan_hours_remaining -= 1
-        if today_cost[scan_hour] > max_price_ahead:
-            max_price_ahead = today_cost[scan_hour]
-        if today_cost[scan_hour] <= min_price_ahead:
-            min_price_ahead = today_cost[scan_hour]
-        if hours_til_cheaper == 0 and cheap_later_test(
-            today_cost, now_hour, scan_hour, now_hour
-        ):
+        price = today_cost[scan_hour]  # Each array read allocates a float
+        if price > max_price_ahead:
+            max_price_ahead = price
+        elif price <= min_price_ahead:
+            min_price_ahead = price
+        if hours_til_cheaper == 0 and scan_hour > cheaper_later_hour:
             hours_til_cheaper = 15 - scan_hours_remaining
             max_price_til_next_cheap = max_price_ahead
 
     if tomorrow_cost is not None:
         for scan_hour in range(0, scan_hours_remaining):
-            if tomorrow_cost[scan_hour] > max_price_ahead:
-                max_price_ahead = tomorrow_cost[scan_hour]
-            if tomorrow_cost[scan_hour] <= min_price_ahead:
-                min_price_ahead = tomorrow_cost[scan_hour]
+            price = tomorrow_cost[scan_hour]
+            if price > max_price_ahead:
+                max_price_ahead = price
+            elif price <= min_price_ahead:
+                min_price_ahead = price
                 if hours_til_cheaper == 0:
                     hours_til_cheaper = (24 - now_hour) + scan_hour
                     max_price_til_next_cheap = max_price_ahead
         scan_hours_remaining = 0
 
-    if min_price_ahead + ACCEPTABLE_PRICING_ERROR >= today_cost[now_hour]:
+    now_price = today_cost[now_hour]
+    now_is_cheap = False
+    if min_price_ahead + ACCEPTABLE_PRICING_ERROR >= now_price:
         if scan_hours_remaining == 0 and hours_til_cheaper == 0:
-            return True  # This very cheapest time to heat
-        if 1 <= hours_til_cheaper <= 2:
-            return False  # Can wait two more hours for cheaper price
-        # Check if long time til next cheap period, or if high price spikes pending
-        return (
-            scan_hours_remaining == 0
-            and (DEGREES_LOST_PER_H * hours_til_cheaper)
-            > DEGREES_PER_H * HIGH_WATER_TAKEOUT_LIKELYHOOD
-        ) or min_price_ahead <= (
-            max_price_til_next_cheap * HIGH_WATER_TAKEOUT_LIKELYHOOD
-        )
-    return False
+            now_is_cheap = True  # This very cheapest time to heat
+        elif not 1 <= hours_til_cheaper <= 2:  # Else wait for cheaper price
+            # Check if long time til next cheap period, or if high price spikes pending
+            now_is_cheap = (
+                scan_hours_remaining == 0
+                and (DEGREES_LOST_PER_H * hours_til_cheaper)
+                > DEGREES_PER_H * HIGH_WATER_TAKEOUT_LIKELYHOOD
+            ) or min_price_ahead <= (
+                max_price_til_next_cheap * HIGH_WATER_TAKEOUT_LIKELYHOOD
+            )
+    now_is_significantly_cheaper = max_price_ahead > (
+        now_price * LOW_PRICE_VARIATION_PERCENT
+    )
+    return (now_is_cheap, now_is_significantly_cheaper)
 
 
+@micropython.native
 def get_cheap_score_until(now_hour, until_hour, today_cost):
     """
     Give the cheapest MAX_HOURS_NEEDED_TO_HEAT a decreasing score
@@ -350,48 +588,49 @@ def get_cheap_score_until(now_hour, until_hour, today_cost):
     Scoring considders ramping vs aggressive heating to cheapest, as well as
     moving completion hour if needed and heating for total of MAX_HOURS_NEEDED_TO_HEAT
     """
+    acceptable_pricing_error = ACCEPTABLE_PRICING_ERROR
     now_price = today_cost[now_hour]
-    cheap_hours = today_cost[0:NORMAL_HOURS_NEEDED_TO_HEAT]
     heat_end_hour = NORMAL_HOURS_NEEDED_TO_HEAT
-    cheapest_price_sum = sum(cheap_hours)
+    cheapest_price_sum = sum(today_cost[0:NORMAL_HOURS_NEEDED_TO_HEAT])
+    scan_price_sum = cheapest_price_sum  # Rolling sum of hours before scan_hour
     score = MAX_HOURS_NEEDED_TO_HEAT  # Assume now_hour is cheapest
     delay_msg = None
     for scan_hour in range(0, until_hour + 1):
         if today_cost[scan_hour] < now_price:
             score -= 1
         if scan_hour > NORMAL_HOURS_NEEDED_TO_HEAT:
-            scan_price_sum = sum(
-                today_cost[(scan_hour - NORMAL_HOURS_NEEDED_TO_HEAT) : scan_hour]
+            scan_price_sum += (
+                today_cost[scan_hour - 1]
+                - today_cost[scan_hour - 1 - NORMAL_HOURS_NEEDED_TO_HEAT]
             )
             delay_saving = (
-                cheapest_price_sum + ACCEPTABLE_PRICING_ERROR - scan_price_sum
+                cheapest_price_sum + acceptable_pricing_error - scan_price_sum
             )
             if delay_saving >= 0:
                 delay_msg = (
                     f"Delaying heatup end to {scan_hour}:00 saves {delay_saving} EUR"
                 )
                 cheapest_price_sum = scan_price_sum
-                cheap_hours = today_cost[
-                    (scan_hour - NORMAL_HOURS_NEEDED_TO_HEAT) : scan_hour
-                ]
                 heat_end_hour = scan_hour
 
-    if (now_price + ACCEPTABLE_PRICING_ERROR) <= sorted(cheap_hours)[
-        NORMAL_HOURS_NEEDED_TO_HEAT - 1
-    ]:
+    cheap_hours = today_cost[
+        (heat_end_hour - NORMAL_HOURS_NEEDED_TO_HEAT) : heat_end_hour
+    ]
+    cheap_hours_max = max(cheap_hours)
+    if (now_price + acceptable_pricing_error) <= cheap_hours_max:
         # If delayed (or late cheap hour) still heat aggressive now
         score = MAX_HOURS_NEEDED_TO_HEAT
 
-    if now_price <= sorted(cheap_hours)[NORMAL_HOURS_NEEDED_TO_HEAT - 1]:
+    if now_price <= cheap_hours_max:
         if delay_msg is not None:
             log_print(delay_msg)
         # Secure correct score inside boost period (with late peak favored)
         min_score = 1
         for cheap_price_route in cheap_hours:
-            if (now_price + ACCEPTABLE_PRICING_ERROR) <= cheap_price_route:
+            if (now_price + acceptable_pricing_error) <= cheap_price_route:
                 min_score += 1
         if (
-            now_price <= (sorted(cheap_hours)[0] + ACCEPTABLE_PRICING_ERROR)
+            now_price <= (min(cheap_hours) + acceptable_pricing_error)
         ) and heat_end_hour == (now_hour + 1):
             min_score = MAX_HOURS_NEEDED_TO_HEAT
         # Secure rampup before boost end
@@ -410,48 +649,45 @@ def get_cheap_score_until(now_hour, until_hour, today_cost):
     return max(score, 0)
 
 
-def get_cheap_score_relative_future(this_hour_cost, future_cost):
-    score = 0
-    for cheap_future_cost in sorted(future_cost)[0:MAX_HOURS_NEEDED_TO_HEAT]:
-        if this_hour_cost < cheap_future_cost:
-            score += 1
-    return score
-
+@micropython.native
+def get_cheap_score_relative_future(
+    this_hour_cost, today_cost, scan_from, scan_to, tomorrow_cost=None, tomorrow_to=0
+):
+    """
+    Number of the cheapest future hours that cost more than this hour.
+    Future hours are today_cost[scan_from:scan_to] and tomorrow_cost[0:tomorrow_to]
+    """
+    score = min(MAX_HOURS_NEEDED_TO_HEAT, max(0, scan_to - scan_from) + tomorrow_to)
+    for scan_hour in range(scan_from, scan_to):
+        if today_cost[scan_hour] <= this_hour_cost:
+            score -= 1
+    for scan_hour in range(0, tomorrow_to):
+        if tomorrow_cost[scan_hour] <= this_hour_cost:
+            score -= 1
+    return max(score, 0)
 
-def cheap_later_test(today_cost, scan_from, scan_to, test_hour):
-    extra_kwh_loss_per_hour_of_pre_heat = (
-        (DEGREES_PER_H + MIN_DAILY_TEMP - AMBIENT_TEMP)
-        / (MIN_DAILY_TEMP - AMBIENT_TEMP)
-        - 1
-    ) * (HEAT_LOSS_PER_DAY_KWH / 24)
-    min_compensated_cost = today_cost[scan_from] * (
-        HEATER_KW + (test_hour - scan_from) * extra_kwh_loss_per_hour_of_pre_heat
-    )
 
-    for i in range(scan_from + 1, scan_to):
-        if i <= test_hour:
-            compensated_cost = today_cost[i] * (
-                HEATER_KW + (test_hour - i) * extra_kwh_loss_per_hour_of_pre_heat
+@micropython.native
+def get_first_cheaper_later_hour(now_hour, today_cost):
+    """
+    First later hour today when heating is cheaper than now, also accounting
+    for the leakage saved by heating later. 24 if there is no such hour.
+    """
+    extra_kwh_loss_per_hour_of_pre_heat = EXTRA_KWH_LOSS_PER_PRE_HEAT_H
+    now_compensated_cost = today_cost[now_hour] * HEATER_KW
+    for scan_hour in range(now_hour + 1, 24):
+        compensated_cost = today_cost[scan_hour] * (
+            HEATER_KW - (scan_hour - now_hour) * extra_kwh_loss_per_hour_of_pre_heat
+        )  # Less energy is used when load is heated later than now_hour
+        if compensated_cost <= now_compensated_cost:
+            log_print(
+                f"Analyzed {now_hour}-24: Delaying beyond {now_hour} worth while (delay til {scan_hour})"
             )
-            min_compensated_cost = min(compensated_cost, min_compensated_cost)
-        else:
-            compensated_cost = today_cost[i] * (
-                HEATER_KW - (i - test_hour) * extra_kwh_loss_per_hour_of_pre_heat
-            )  # Less energy is used when load is heated later than test_hour
-            if compensated_cost <= min_compensated_cost:
-                log_print(
-                    f"Analyzed {scan_from}-{scan_to}: Delaying beyond {test_hour} worth while (delay til {i})"
-                )
-                return True  # Found cost to be cheaper if heating later
-    return False
-
-
-def is_now_cheapest_remaining_during_comfort(today_cost, local_hour):
-    return not cheap_later_test(
-        today_cost, local_hour, DAILY_COMFORT_LAST_H, local_hour
-    )
+            return scan_hour
+    return 24
 
 
+@micropython.native
 def hours_to_next_lower_price(today_cost, scan_from):
     min_price = today_cost[scan_from]
     for i in range(scan_from + 1, DAILY_COMFORT_LAST_H):
@@ -460,46 +696,76 @@ def hours_to_next_lower_price(today_cost, scan_from):
     return 0
 
 
-def next_night_is_cheaper(today_cost):
-    return cheap_later_test(today_cost, 0, 24, DAILY_COMFORT_LAST_H)
-
-
-def is_the_cheapest_hour_during_daytime(today_cost):
-    return cheap_later_test(today_cost, 0, DAILY_COMFORT_LAST_H, LAST_MORNING_HEATING_H)
-
-
-def is_now_significantly_cheaper(now_hour, today_cost, tomorrow_cost):
+@micropython.native
+def summarize_day_cost(today_cost):
     """
-    Scan 16h ahead and check if now is significantly cheaper than max price ahead
+    Single scan of today_cost answering the two whole day questions:
+    Is daytime heating cheaper than morning heating (heating later than
+    LAST_MORNING_HEATING_H but before DAILY_COMFORT_LAST_H), and is next night
+    cheaper than the comfort period (heating later than DAILY_COMFORT_LAST_H).
     """
-    scan_hours_remaining = 16
-    max_price_ahead = today_cost[now_hour]
-    for scan_hour in range(now_hour, min(24, now_hour + scan_hours_remaining)):
-        scan_hours_remaining -= 1
-        if today_cost[scan_hour] > max_price_ahead:
-            max_price_ahead = today_cost[scan_hour]
-
-    if tomorrow_cost is not None:
-        for scan_hour in range(0, scan_hours_remaining):
-            if tomorrow_cost[scan_hour] > max_price_ahead:
-                max_price_ahead = tomorrow_cost[scan_hour]
-
-    return today_cost[now_hour] * LOW_PRICE_VARIATION_PERCENT < max_price_ahead
+    kwh_loss_per_h = EXTRA_KWH_LOSS_PER_PRE_HEAT_H
+    first_price = today_cost[0]
+    min_morning_cost = first_price * (
+        HEATER_KW + LAST_MORNING_HEATING_H * kwh_loss_per_h
+    )
+    min_comfort_cost = first_price * (HEATER_KW + DAILY_COMFORT_LAST_H * kwh_loss_per_h)
+    daytime_is_cheaper = False
+    next_night_is_cheaper = False
+    for hour in range(1, 24):
+        price = today_cost[hour]
+        if hour <= LAST_MORNING_HEATING_H:
+            min_morning_cost = min(
+                min_morning_cost,
+                price * (HEATER_KW + (LAST_MORNING_HEATING_H - hour) * kwh_loss_per_h),
+            )
+        elif hour < DAILY_COMFORT_LAST_H and not daytime_is_cheaper:
+            daytime_is_cheaper = (
+                price * (HEATER_KW - (hour - LAST_MORNING_HEATING_H) * kwh_loss_per_h)
+                <= min_morning_cost
+            )
+            if daytime_is_cheaper:
+                log_print(
+                    f"Analyzed 0-{DAILY_COMFORT_LAST_H}: Delaying beyond {LAST_MORNING_HEATING_H} worth while (delay til {hour})"
+                )
+        if hour <= DAILY_COMFORT_LAST_H:
+            min_comfort_cost = min(
+                min_comfort_cost,
+                price * (HEATER_KW + (DAILY_COMFORT_LAST_H - hour) * kwh_loss_per_h),
+            )
+        elif not next_night_is_cheaper:
+            next_night_is_cheaper = (
+                price * (HEATER_KW - (hour - DAILY_COMFORT_LAST_H) * kwh_loss_per_h)
+                <= min_comfort_cost
+            )
+            if next_night_is_cheaper:
+                log_print(
+                    f"Analyzed 0-24: Delaying beyond {DAILY_COMFORT_LAST_H} worth while (delay til {hour})"
+                )
+    return (daytime_is_cheaper, next_night_is_cheaper)
 
 
+@micropython.native
 def add_scorebased_wanted_temperature(
-    local_hour, today_cost, tomorrow_cost, outside_temp, wanted_temp
+    local_hour,
+    today_cost,
+    tomorrow_cost,
+    outside_temp,
+    wanted_temp,
+    day_summary,
+    now_is_significantly_cheaper,
 ):
+    daytime_is_cheaper, next_night_is_cheaper = day_summary
     score_based_heating = 0
     max_temp_limit = MAX_TEMP
     if local_hour <= LAST_MORNING_HEATING_H:
         score_based_heating = get_cheap_score_until(
             local_hour, LAST_MORNING_HEATING_H, today_cost
         )
-        if is_the_cheapest_hour_during_daytime(today_cost):
+        if daytime_is_cheaper:
             # limit morning heating much if daytime heating is cheap
             max_temp_limit = MIN_DAILY_TEMP + (LAST_MORNING_HEATING_H - local_hour)
-        elif next_night_is_cheaper(today_cost):
+        elif next_night_is_cheaper:
             max_temp_limit = MIN_DAILY_TEMP + DEGREES_PER_H
 
     if local_hour <= DAILY_COMFORT_LAST_H:
@@ -508,19 +774,23 @@ def add_scorebased_wanted_temperature(
             get_cheap_score_until(local_hour, DAILY_COMFORT_LAST_H, today_cost),
         )
 
-    if not is_now_significantly_cheaper(local_hour, today_cost, tomorrow_cost):
+    if not now_is_significantly_cheaper:
         max_temp_limit = MIN_DAILY_TEMP  # Resrict heating if only slightly cheaper
 
     if tomorrow_cost is not None:
         preload_score = get_cheap_score_relative_future(
             today_cost[local_hour],
-            today_cost[local_hour:23] + tomorrow_cost[0:LAST_MORNING_HEATING_H],
+            today_cost,
+            local_hour,
+            23,
+            tomorrow_cost,
+            LAST_MORNING_HEATING_H,
         )
         if preload_score > 0:
             score_based_heating = max(score_based_heating, preload_score)
         else:
             max_temp_limit = MIN_DAILY_TEMP  # Will become cheaper tomorrow morning
-            if is_the_cheapest_hour_during_daytime(today_cost):
+            if daytime_is_cheaper:
                 max_temp_limit += DEGREES_PER_H  # Heat since limited morning heat
 
     max_score = MAX_HOURS_NEEDED_TO_HEAT
@@ -540,14 +810,14 @@ def add_scorebased_wanted_temperature(
     return wanted_temp
 
 
-def get_wanted_temp_boost(local_hour, weekday, today_cost):
+@micropython.native
+def get_wanted_temp_boost(local_hour, weekday, today_cost, cheaper_later_hour):
     wanted_temp_boost = 0
-    if weekday in WEEKDAYS_WITH_EXTRA_TAKEOUT and local_hour < DAILY_COMFORT_LAST_H:
+    if (EXTRA_TAKEOUT_MASK >> weekday) & 1 and local_hour < DAILY_COMFORT_LAST_H:
         wanted_temp_boost += 5
 
-    if (
-        weekday in WEEKDAYS_WITH_EXTRA_MORNING_TAKEOUT
-        and local_hour <= LAST_MORNING_HEATING_H
+    if (EXTRA_MORNING_TAKEOUT_MASK >> weekday) & 1 and (
+        local_hour <= LAST_MORNING_HEATING_H
     ):
         wanted_temp_boost += 5
 
@@ -555,49 +825,81 @@ def get_wanted_temp_boost(local_hour, weekday, today_cost):
         if today_cost[local_hour] < HIGH_PRICE_THRESHOLD:
             wanted_temp_boost += 5  # Slightly raise hot water takeout capacity
         if local_hour < 23 and today_cost[local_hour] < today_cost[local_hour + 1]:
-            hours_to_bridge = hours_to_next_lower_price(today_cost, local_hour)
-            if is_now_cheapest_remaining_during_comfort(today_cost, local_hour):
+            if cheaper_later_hour >= DAILY_COMFORT_LAST_H:  # Cheapest remaining
                 hours_to_bridge = 1 + (DAILY_COMFORT_LAST_H - local_hour)
+            else:
+                hours_to_bridge = hours_to_next_lower_price(today_cost, local_hour)
             # Better heat now rather than later
             wanted_temp_boost += DEGREES_LOST_PER_H * hours_to_bridge
 
     return wanted_temp_boost
 
 
+def is_alarm_fully_armed(alarm_status):
+    if alarm_status is None:
+        return False
+    fully_armed = alarm_status.is_fully_armed()
+    gc.collect()  # Avoid fragmentation after alarm API use
+    return fully_armed
+
+
+def get_expensive_price(today_cost):
+    # Lowest price among the NUM_MOST_EXPENSIVE_HOURS most expensive hours
+    return sorted(today_cost)[len(today_cost) - NUM_MOST_EXPENSIVE_HOURS]
+
+
+@micropython.native
 def get_wanted_temp(
-    local_hour, weekday, today_cost, tomorrow_cost, outside_temp, alarm_status
+    local_hour,
+    weekday,
+    today_cost,
+    tomorrow_cost,
+    outside_temp,
+    alarm_armed,
+    expensive_price,
+    day_summary,
 ):
+    now_price = today_cost[local_hour]
+    cheaper_later_hour = get_first_cheaper_later_hour(local_hour, today_cost)
     wanted_temp = MIN_TEMP
 
-    if alarm_status is None or not alarm_status.is_fully_armed():
-        wanted_temp += get_wanted_temp_boost(local_hour, weekday, today_cost)
+    if not alarm_armed:
+        wanted_temp += get_wanted_temp_boost(
+            local_hour, weekday, today_cost, cheaper_later_hour
+        )
     elif MAX_HOURS_NEEDED_TO_HEAT <= local_hour < DAILY_COMFORT_LAST_H:
-        if is_now_cheapest_remaining_during_comfort(today_cost, local_hour):
+        if cheaper_later_hour >= DAILY_COMFORT_LAST_H:  # Cheapest remaining
             wanted_temp += (
                 1 + (DAILY_COMFORT_LAST_H - local_hour)
             ) * DEGREES_LOST_PER_H
-    gc.collect()  # Avoid fragmentation after alarm API use
 
+    now_is_cheap, now_is_significantly_cheaper = summarize_forecast(
+        local_hour, today_cost, tomorrow_cost, cheaper_later_hour
+    )
     wanted_temp = add_scorebased_wanted_temperature(
-        local_hour, today_cost, tomorrow_cost, outside_temp, wanted_temp
+        local_hour,
+        today_cost,
+        tomorrow_cost,
+        outside_temp,
+        wanted_temp,
+        day_summary,
+        now_is_significantly_cheaper,
     )
 
     if MAX_HOURS_NEEDED_TO_HEAT < local_hour <= LAST_MORNING_HEATING_H:
-        if not cheap_later_test(
-            today_cost, local_hour, FIRST_EVENING_HIGH_TAKEOUT_H, local_hour
-        ):
+        if cheaper_later_hour >= FIRST_EVENING_HIGH_TAKEOUT_H:
             wanted_temp = max(wanted_temp, MIN_DAILY_TEMP)  # Maintain morning heating
     if DAILY_COMFORT_LAST_H > local_hour > LAST_MORNING_HEATING_H and (
         MAX_HOURS_NEEDED_TO_HEAT - 1
     ) <= get_cheap_score_relative_future(
-        today_cost[local_hour], today_cost[LAST_MORNING_HEATING_H:DAILY_COMFORT_LAST_H]
+        now_price, today_cost, LAST_MORNING_HEATING_H, DAILY_COMFORT_LAST_H
     ):
         wanted_temp = max(wanted_temp, MIN_DAILY_TEMP)  # Restore comfort once per day
 
-    if today_cost[local_hour] >= sorted(today_cost)[24 - NUM_MOST_EXPENSIVE_HOURS]:
+    if now_price >= expensive_price:
         wanted_temp = MIN_NUDGABLE_TEMP  # Min temp during most expensive hours in day
 
-    if now_is_cheap_in_forecast(local_hour, today_cost, tomorrow_cost):
+    if now_is_cheap:
         wanted_temp = max(wanted_temp, MIN_DAILY_TEMP)
         if local_hour <= LAST_MORNING_HEATING_H:
             wanted_temp = max(wanted_temp, MIN_DAILY_TEMP + DEGREES_PER_H)
@@ -605,16 +907,24 @@ def get_wanted_temp(
     return wanted_temp
 
 
+def get_dst_bounds(year):
+    global dst_bounds
+
+    if dst_bounds[0] != year:  # Only changes at new year
+        dst_start = time.mktime(
+            (year, 3, (31 - (int(5 * year / 4 + 4)) % 7), 1, 0, 0, 0, 0, 0)
+        )
+        dst_end = time.mktime(
+            (year, 10, (31 - (int(5 * year / 4 + 1)) % 7), 1, 0, 0, 0, 0, 0)
+        )
+        dst_bounds = (year, dst_start, dst_end)
+    return dst_bounds
+
+
 def get_local_date_and_hour(utc_unix_timestamp):
     local_unix_timestamp = utc_unix_timestamp + UTC_OFFSET_IN_S
     now = time.gmtime(local_unix_timestamp)
-    year = now[0]
-    dst_start = time.mktime(
-        (year, 3, (31 - (int(5 * year / 4 + 4)) % 7), 1, 0, 0, 0, 0, 0)
-    )
-    dst_end = time.mktime(
-        (year, 10, (31 - (int(5 * year / 4 + 1)) % 7), 1, 0, 0, 0, 0, 0)
-    )
+    _, dst_start, dst_end = get_dst_bounds(now[0])
     if dst_start < local_unix_timestamp < dst_end:
         now = time.gmtime(local_unix_timestamp + 3600)
     adjusted_day = date(now[0], now[1], now[2])
@@ -622,9 +932,9 @@ def get_local_date_and_hour(utc_unix_timestamp):
     return (adjusted_day, now[3])
 
 
-async def delay_minor_temp_increase(wanted_temp, thermostat):
+async def delay_minor_temp_increase(wanted_temp, thermostat, current_minute):
     diff_temp = wanted_temp - thermostat.prev_degrees
-    if 0 < diff_temp < DEGREES_PER_H and time.localtime()[4] < 45:
+    if 0 < diff_temp < DEGREES_PER_H and current_minute < 45:
         temp_raise_delay = (45 * SEC_PER_MIN) - (
             (diff_temp / DEGREES_PER_H) * 45 * SEC_PER_MIN
         )
@@ -641,21 +951,28 @@ async def run_hotwater_optimization(thermostat, alarm_status, boost_req):
     today_cost = None
     tomorrow_cost = None
     tomorrow_final = False
+    price_version = 0  # Bumped whenever today_cost or tomorrow_cost is replaced
+    last_wanted = None  # (inputs, wanted_temp) of the latest get_wanted_temp call
+    price_retry_min = 1  # Doubled per miss, prices are most likely right after :45
+    evaluated_hour = None  # Hour the thermostat was last set for
     days_since_legionella = 0
     peak_temp_today = 0
     pending_legionella_reset = False
     temperature_provider = SimpleTemperatureProvider()
+    localtime = time.localtime
+    real_time = OVERRIDE_UTC_UNIX_TIMESTAMP is None
 
     if boost_req:
         log_print("Boosting...")
-        thermostat.set_thermosat(MIN_LEGIONELLA_TEMP)
+        await thermostat.set_thermosat(MIN_LEGIONELLA_TEMP)
         await asyncio.sleep(EXTRA_HOT_DURATION_S)
 
     while True:
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(0)  # Just yield, the waits below pace the loop
         new_today, local_hour = get_local_date_and_hour(
             time_provider.get_utc_unix_timestamp()
         )
+        current_minute = localtime()[4]
         if today_cost is None or new_today != today:
             peak_temp_today = 0
             today = new_today
@@ -664,123 +981,181 @@ async def run_hotwater_optimization(thermostat, alarm_status, boost_req):
                 pending_legionella_reset = False
             days_since_legionella += 1
             today_cost = tomorrow_cost
+            if today_cost is None:
+                today_cost = load_cost(today)
             if today_cost is None:
                 today_final, today_cost = await get_cost(today)
                 if today_final is None:
                     raise RuntimeError("Optimization not possible")
+                if today_final:
+                    save_cost(today, today_cost)
             tomorrow_final, tomorrow_cost = (False, None)
+            price_retry_min = 1
+            evaluated_hour = None
+            weekday = today.weekday()
+            expensive_price = get_expensive_price(today_cost)
+            day_summary = summarize_day_cost(today_cost)
+            price_version += 1
 
         if not tomorrow_final and (
             (local_hour > NEW_PRICE_EXPECTED_HOUR)
             or (
                 local_hour == NEW_PRICE_EXPECTED_HOUR
-                and time.localtime()[4] >= NEW_PRICE_EXPECTED_MIN
+                and current_minute >= NEW_PRICE_EXPECTED_MIN
             )
         ):
-            tomorrow_final, tomorrow_cost = await get_cost(today + timedelta(days=1))
-            gc.collect()
-
-        log_print(
-            f"Cost optimizing for {today.day} / {today.month} {today.year} {local_hour}:00 @ {today_cost[local_hour]} EUR / kWh"
-        )
-        outside_temp = temperature_provider.get_outdoor_temp()
-        wanted_temp = get_wanted_temp(
-            local_hour,
-            today.weekday(),
-            today_cost,
-            tomorrow_cost,
-            outside_temp,
-            alarm_status,
-        )
-        if days_since_legionella > LEGIONELLA_INTERVAL and (
-            (LAST_MORNING_HEATING_H - 2) <= local_hour <= LAST_MORNING_HEATING_H
-        ):  # Secure legionella temperature gets reached
-            wanted_temp = max(wanted_temp, MIN_LEGIONELLA_TEMP)
-        if wanted_temp >= MIN_LEGIONELLA_TEMP:
-            pending_legionella_reset = True
-
-        pretty_min = f"{time.localtime()[4]}"
-        if len(pretty_min) == 1:
-            pretty_min = f"0{pretty_min}"
-        log_print(
-            f"-- {local_hour}:{pretty_min} thermostat @ {wanted_temp}. Outside is {outside_temp}. Tomorrow {tomorrow_cost is not None}"
-        )
+            prev_tomorrow_cost = tomorrow_cost
+            tomorrow_cost = load_cost(today + ONE_DAY)  # Fetched before a restart?
+            tomorrow_final = tomorrow_cost is not None
+            if not tomorrow_final:
+                tomorrow_final, tomorrow_cost = await get_cost(today + ONE_DAY)
+                if tomorrow_final:
+                    save_cost(today + ONE_DAY, tomorrow_cost)
+            if tomorrow_cost is not prev_tomorrow_cost:  # Both None if unpublished
+                price_version += 1
+
+        now_price = today_cost[local_hour]
+        retrying_price = evaluated_hour == local_hour and tomorrow_cost is None
+        if not retrying_price:  # Else the thermostat is already set for this hour
+            log_print(
+                f"Cost optimizing for {today.day} / {today.month} {today.year} {local_hour}:00 @ {now_price} EUR / kWh"
+            )
+            outside_temp = await temperature_provider.get_outdoor_temp()
+            wanted_inputs = (
+                local_hour,
+                price_version,
+                outside_temp,
+                is_alarm_fully_armed(alarm_status),
+            )
+            if last_wanted is not None and last_wanted[0] == wanted_inputs:
+                wanted_temp = last_wanted[1]  # Evaluated while nudging
+            else:
+                wanted_temp = get_wanted_temp(
+                    local_hour,
+                    weekday,
+                    today_cost,
+                    tomorrow_cost,
+                    outside_temp,
+                    wanted_inputs[3],
+                    expensive_price,
+                    day_summary,
+                )
+                last_wanted = (wanted_inputs, wanted_temp)
+            if days_since_legionella > LEGIONELLA_INTERVAL and (
+                (LAST_MORNING_HEATING_H - 2) <= local_hour <= LAST_MORNING_HEATING_H
+            ):  # Secure legionella temperature gets reached
+                wanted_temp = max(wanted_temp, MIN_LEGIONELLA_TEMP)
+            if wanted_temp >= MIN_LEGIONELLA_TEMP:
+                pending_legionella_reset = True
+
+            log_print(
+                f"-- {local_hour}:{current_minute:02d} thermostat @ {wanted_temp}. Outside is {outside_temp}. Tomorrow {tomorrow_cost is not None}"
+            )
 
-        peak_temp_today = max(peak_temp_today, wanted_temp)
-        if today.weekday() in WEEKDAYS_WITH_EXTRA_MORNING_TAKEOUT and local_hour == (
-            LAST_MORNING_HEATING_H - 1
-        ):
-            wanted_temp = peak_temp_today + DEGREES_PER_H / 4
+            peak_temp_today = max(peak_temp_today, wanted_temp)
+            if (EXTRA_MORNING_TAKEOUT_MASK >> weekday) & 1 and local_hour == (
+                LAST_MORNING_HEATING_H - 1
+            ):
+                wanted_temp = peak_temp_today + DEGREES_PER_H / 4
 
-        if local_hour <= NEW_PRICE_EXPECTED_HOUR or tomorrow_cost is not None:
-            await delay_minor_temp_increase(wanted_temp, thermostat)
+            if local_hour <= NEW_PRICE_EXPECTED_HOUR or tomorrow_cost is not None:
+                await delay_minor_temp_increase(wanted_temp, thermostat, current_minute)
 
-        thermostat.set_thermosat(wanted_temp)
-        curr_min = time.localtime()[4]
-        if curr_min <= 50 and OVERRIDE_UTC_UNIX_TIMESTAMP is None:
+            await thermostat.set_thermosat(wanted_temp)
+            evaluated_hour = local_hour
+        curr_min = localtime()[4]
+        if curr_min <= 50 and real_time:
             if local_hour == NEW_PRICE_EXPECTED_HOUR and tomorrow_cost is None:
                 if curr_min < NEW_PRICE_EXPECTED_MIN:
-                    await asyncio.sleep(
-                        (NEW_PRICE_EXPECTED_MIN - curr_min) * SEC_PER_MIN
+                    await asyncio.sleep_ms(
+                        (NEW_PRICE_EXPECTED_MIN - curr_min) * MS_PER_MIN
                     )
                 else:
-                    await asyncio.sleep(1 * SEC_PER_MIN)  # Retry price fetching
+                    await asyncio.sleep_ms(price_retry_min * MS_PER_MIN)  # Retry
+                    price_retry_min *= 2
                 continue
-            await asyncio.sleep(
-                (50 - curr_min) * SEC_PER_MIN
+            gc.collect()  # Collect here rather than during servo moves
+            await asyncio.sleep_ms(
+                (50 - curr_min) * MS_PER_MIN
             )  # Sleep slightly before next hour
-        if local_hour < 23 and OVERRIDE_UTC_UNIX_TIMESTAMP is None:
+        next_price = today_cost[local_hour + 1] if local_hour < 23 else now_price
+        if real_time and next_price != now_price:  # Else no nudge
+            next_hour_inputs = (
+                local_hour + 1,
+                price_version,
+                await temperature_provider.get_outdoor_temp(),
+                is_alarm_fully_armed(alarm_status),
+            )
             next_hour_wanted_temp = get_wanted_temp(
                 local_hour + 1,
-                today.weekday(),
+                weekday,
                 today_cost,
                 tomorrow_cost,
-                temperature_provider.get_outdoor_temp(),
-                alarm_status,
+                next_hour_inputs[2],
+                next_hour_inputs[3],
+                expensive_price,
+                day_summary,
             )
-            if (
-                next_hour_wanted_temp >= wanted_temp
-                and today_cost[local_hour + 1] < today_cost[local_hour]
-            ):
-                thermostat.nudge_down()
-            if (
-                next_hour_wanted_temp <= wanted_temp
-                and today_cost[local_hour + 1] > today_cost[local_hour]
-            ):
-                thermostat.nudge_up()
+            last_wanted = (next_hour_inputs, next_hour_wanted_temp)
+            if next_hour_wanted_temp >= wanted_temp and next_price < now_price:
+                await thermostat.nudge_down()
+            if next_hour_wanted_temp <= wanted_temp and next_price > now_price:
+                await thermostat.nudge_up()
 
         time_provider.hourly_timekeeping()
-        if OVERRIDE_UTC_UNIX_TIMESTAMP is None:
-            await asyncio.sleep(12 * SEC_PER_MIN)  # Sleep slightly into next hour
+        if real_time:
+            await asyncio.sleep_ms(12 * MS_PER_MIN)  # Sleep slightly into next hour
 
 
 async def handle_client(reader, writer):
     global last_log
 
-    request_line = await reader.readline()
-
-    # Skip HTTP request headers
-    while await reader.readline() != b"\r\n":
+    # Read request line and headers in as few reads as possible
+    request_head = b""
+    try:
+        while (
+            b"\r\n\r\n" not in request_head
+            and len(request_head) < REQUEST_HEAD_MAX_BYTES
+        ):
+            chunk = await asyncio.wait_for(
+                reader.read(REQUEST_HEAD_MAX_BYTES - len(request_head)),
+                REQUEST_TIMEOUT_S,
+            )
+            if not chunk:
+                break
+            request_head += chunk
+    except asyncio.TimeoutError:
         pass
 
-    request = str(request_line, "utf-8").split()[1]
-    if request == "/favicon.ico":
+    # Request target is between the first two spaces of the request line
+    line_end = request_head.find(b"\r\n")
+    target_start = request_head.find(b" ", 0, line_end) + 1
+    target_end = request_head.find(b" ", target_start, line_end)
+    if target_start == 0 or target_end < 0:  # Timed out or not HTTP
+        writer.close()
+        await writer.wait_closed()
         return
-    log_print("Request: ", request)
+    request = request_head[target_start:target_end]
+    if request == b"/favicon.ico":  # Browser noise, answered before any decode
+        writer.write(HTTP_404)
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+        return
+    request = str(request, "utf-8")
+    log_print(f"Request: {request}")
     
-    try:
-        if request != "/log":
+    if request != "/log":  # Log polls never enter the override parsing
+        try:
             override_temp = float(request[1:])
+        except ValueError:
+            log_print("Failed to parse target temp req as float")
+        else:
             log_print(f"Overriding thermostat until next schedule point {override_temp}")
-            shared_thermostat.set_thermosat(override_temp)
-    except ValueError:
-        log_print("Failed to parse target temp req as float")
-
-    writer.write("HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n")
-    log_cpy = last_log.copy()
-    for log_row in log_cpy:
-        writer.write(log_row)
-        writer.write("<br>")
+            await shared_thermostat.set_thermosat(override_temp)
+
+    writer.write(HTTP_200_HTML)
+    writer.write(last_log)  # Already rendered as HTML rows
     await writer.drain()
     await writer.wait_closed()
 
@@ -788,8 +1163,9 @@ async def handle_client(reader, writer):
 async def main():
     if "Pico W" in sys.implementation._machine:
         thermostat = shared_thermostat
-        thermostat.set_thermosat(MIN_NUDGABLE_TEMP)
+        await thermostat.set_thermosat(MIN_NUDGABLE_TEMP)
         attemts_remaing_before_reset = MAX_NETWORK_ATTEMPTS
+        backoff_s = MIN_BACKOFF_S
         while attemts_remaing_before_reset > 0:
             try:
                 log_print("Setting up wifi")
@@ -798,8 +1174,11 @@ async def main():
             except Exception as setup_e:
                 log_print("Delaying due to exception...")
                 log_print(setup_e)
-                time.sleep(30)
-                attemts_remaing_before_reset -= 1
+            # Back off outside the handler so the exception is released first
+            gc.collect()
+            time.sleep(backoff_s)
+            backoff_s = min(2 * backoff_s, MAX_BACKOFF_S)
+            attemts_remaing_before_reset -= 1
 
         alarm_status = None
         try:
@@ -809,16 +1188,21 @@ async def main():
         else:
             alarm_status = usector_alarm_status.AlarmStatusProvider()
 
-        server = asyncio.start_server(handle_client, "0.0.0.0", 80)
-        tasks = [server]
+        # Collect automatically before the heap runs low, rather than on demand
+        gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+        # Serves in its own task from here on, independent of the optimization
+        await asyncio.start_server(handle_client, "0.0.0.0", 80)
         boost_req = machine.reset_cause() == machine.PWRON_RESET
+        backoff_s = MIN_BACKOFF_S
 
         while attemts_remaing_before_reset > 0:
-            gc.collect()
-            tasks.append(run_hotwater_optimization(thermostat, alarm_status, boost_req))
+            optimization = run_hotwater_optimization(
+                thermostat, alarm_status, boost_req
+            )
             boost_req = False
+            run_start_ticks = time.ticks_ms()  # Unaffected by the NTP sync in the run
             try:
-                await asyncio.gather(*tasks, return_exceptions=False)
+                await optimization
                 log_print("Unexpected success termination...")
                 break
             except Exception as e:
@@ -826,19 +1210,25 @@ async def main():
                     f"Delaying due to exception... {attemts_remaing_before_reset}"
                 )
                 log_print(e)
-                wlan = network.WLAN(network.STA_IF)
-                log_print(f"rssi = {wlan.status('rssi')}")
-                tasks.pop(1)
-                log_print("Starting fresh optimization")
-                await asyncio.sleep(30)
-                setup_wifi()
-                attemts_remaing_before_reset -= 1
+            # Drop the failed task and exception before backing off
+            optimization = None
+            gc.collect()
+            wlan = network.WLAN(network.STA_IF)
+            log_print(f"rssi = {wlan.status('rssi')}")
+            log_print("Starting fresh optimization")
+            if time.ticks_diff(time.ticks_ms(), run_start_ticks) > HEALTHY_RUN_S * 1000:
+                backoff_s = MIN_BACKOFF_S  # Failure after a healthy run, not a streak
+            await asyncio.sleep_ms(backoff_s * 1000)
+            backoff_s = min(2 * backoff_s, MAX_BACKOFF_S)
+            setup_wifi()
+            attemts_remaing_before_reset -= 1
         log_print("Resetting to recover")
         await asyncio.sleep(10)
         machine.reset()
 
 # Globals
-last_log = []
+last_log = bytearray()  # HTML rendered log rows
+dst_bounds = (None, 0, 0)  # (year, dst_start, dst_end) in local unix time
 shared_thermostat = Thermostat()
 
 
@@ -851,6 +1241,6 @@ if __name__ == "__main__":
     try:
         ev_loop.run_forever()
     except Exception as e:
-        log_print("Error occured: ", e)
+        log_print(f"Error occured: {e}")
     except KeyboardInterrupt:
         log_print("Program Interrupted by the user")